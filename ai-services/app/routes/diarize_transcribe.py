@@ -1,7 +1,7 @@
 import os
 import shutil
-from fastapi import APIRouter, UploadFile, File, HTTPException
-from typing import List
+from fastapi import APIRouter, UploadFile, File, HTTPException, Form
+from typing import List, Optional
 import logging
 
 from app.services.diarization_service import DiarizationService
@@ -25,11 +25,20 @@ except Exception as e:
     raise
 
 @router.post("/diarize-transcribe", tags=["AI Services"])
-async def diarize_transcribe_audio(file: UploadFile = File(...)):
+async def diarize_transcribe_audio(
+    file: UploadFile = File(...),
+    num_speakers: Optional[int] = Form(None, ge=1),
+    min_speakers: Optional[int] = Form(None, ge=1),
+    max_speakers: Optional[int] = Form(None, ge=1)
+):
     """
     Accepts an audio file, performs speaker diarization, and then transcribes
-    the speech for each speaker segment.
+    the speech for each speaker segment. Enrolled speakers are labelled by name.
+    Optional speaker counts constrain the clustering step when the number of
+    participants is known.
     """
+    if min_speakers is not None and max_speakers is not None and min_speakers > max_speakers:
+        raise HTTPException(status_code=400, detail="min_speakers cannot be greater than max_speakers.")
     
     # Create a temporary path to store the uploaded file
     temp_dir = "temp_audio"
@@ -45,7 +54,12 @@ async def diarize_transcribe_audio(file: UploadFile = File(...)):
 
         # 1. Perform Diarization
         logger.info("Starting diarization process...")
-        diarized_segments = diarization_service.diarize(temp_file_path)
+        diarized_segments = diarization_service.diarize(
+            temp_file_path,
+            num_speakers=num_speakers,
+            min_speakers=min_speakers,
+            max_speakers=max_speakers
+        )
 
         if not diarized_segments:
             return {
@@ -0,0 +1,78 @@
+import os
+import shutil
+import uuid
+from fastapi import APIRouter, UploadFile, File, HTTPException, Form
+import logging
+
+from app.routes.diarize_transcribe import diarization_service
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+TEMP_DIR = "temp_audio"
+os.makedirs(TEMP_DIR, exist_ok=True)
+
+def _require_speaker_index():
+    """
+    Return the speaker index, or fail with 503 if it cannot be loaded.
+    """
+    try:
+        return diarization_service.require_speaker_index()
+    except (ValueError, OSError) as e:
+        logger.error(f"Speaker index unavailable: {e}")
+        raise HTTPException(status_code=503, detail=f"Speaker index unavailable: {e}")
+
+@router.post("/speakers", tags=["Speakers"])
+async def enroll_speaker(
+    file: UploadFile = File(...),
+    name: str = Form(...)
+):
+    """
+    Enroll a speaker from a voice sample so future diarizations label them by name.
+    Enrolling an existing name refines that speaker's stored voice.
+    """
+    _require_speaker_index()
+
+    file_extension = os.path.splitext(file.filename)[1]
+    temp_file_path = os.path.join(TEMP_DIR, f"{uuid.uuid4()}{file_extension}")
+
+    try:
+        with open(temp_file_path, "wb") as buffer:
+            shutil.copyfileobj(file.file, buffer)
+
+        speaker = diarization_service.enroll_speaker(temp_file_path, name)
+        return {
+            "status": "success",
+            "speaker": speaker
+        }
+
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Failed to enroll speaker '{name}': {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        if os.path.exists(temp_file_path):
+            os.remove(temp_file_path)
+
+@router.get("/speakers", tags=["Speakers"])
+def list_speakers():
+    """
+    List all enrolled speakers.
+    """
+    return {
+        "status": "success",
+        "speakers": _require_speaker_index().list_speakers()
+    }
+
+@router.delete("/speakers/{speaker_id}", tags=["Speakers"])
+def delete_speaker(speaker_id: str):
+    """
+    Remove an enrolled speaker from the index.
+    """
+    if not _require_speaker_index().delete(speaker_id):
+        raise HTTPException(status_code=404, detail=f"Speaker not found: {speaker_id}")
+    return {"status": "success"}
@@ -4,8 +4,11 @@ import torch
 from pyannote.audio import Pipeline
 from pydub import AudioSegment
 import numpy as np
+from typing import List, Dict, Optional, Tuple
 from dotenv import load_dotenv
 
+from app.services.speaker_index import SpeakerIndex, get_speaker_index
+
 # Load environment variables from .env file
 load_dotenv()
 
@@ -16,10 +19,25 @@ logger = logging.getLogger(__name__)
 hf_token = os.getenv("HUGGING_FACE_TOKEN")
 
 class DiarizationService:
-    def __init__(self):
+    def __init__(self, speaker_index: Optional[SpeakerIndex] = None, match_threshold: Optional[float] = None):
         """
         Initialize the Diarization pipeline using pyannote.audio.
+
+        Args:
+            speaker_index (SpeakerIndex): Index of enrolled voices. Defaults to the shared index;
+                if that cannot be loaded, speaker recognition is disabled.
+            match_threshold (float): Minimum cosine similarity for a speaker to be recognised.
         """
+        if speaker_index is None:
+            try:
+                speaker_index = get_speaker_index()
+            except (ValueError, OSError) as e:
+                # Recognition is optional; a damaged index must not stop diarization
+                logger.error(f"Failed to load speaker index, speaker recognition disabled: {e}")
+        self.speaker_index = speaker_index
+        self.match_threshold = match_threshold if match_threshold is not None \
+            else float(os.getenv("SPEAKER_MATCH_THRESHOLD", "0.5"))
+
         self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
         logger.info(f"Using device: {self.device} for diarization")
 
@@ -40,64 +58,135 @@ class DiarizationService:
             logger.error(f"Failed to load pyannote.audio pipeline: {e}")
             raise
 
-    def diarize(self, audio_path: str):
+    def _load_waveform(self, audio_path: str) -> Dict:
         """
-        Perform speaker diarization on an audio file.
-        
-        Args:
-            audio_path (str): Path to the audio file.
+        Load an audio file as the 16kHz mono waveform dictionary pyannote expects.
+        """
+        # Load audio with pydub
+        audio = AudioSegment.from_file(audio_path)
+        # pyannote expects 16kHz mono
+        audio = audio.set_frame_rate(16000).set_channels(1)
 
-        Returns:
-            A list of speaker segments with start time, end time, and speaker label.
+        # Convert to numpy array and then to torch tensor
+        # pydub audio is int16 (usually), normalize to float between -1 and 1
+        data = np.array(audio.get_array_of_samples())
+
+        # Convert to float32 and normalize
+        if audio.sample_width == 2:
+            data = data.astype(np.float32) / 32768.0
+        elif audio.sample_width == 4:
+            data = data.astype(np.float32) / 2147483648.0
+
+        # Create torch tensor of shape (channels, time) -> (1, time)
+        waveform = torch.from_numpy(data).unsqueeze(0)
+
+        return {"waveform": waveform, "sample_rate": 16000}
+
+    def _run_pipeline(self, audio_path: str, num_speakers: Optional[int] = None,
+                      min_speakers: Optional[int] = None, max_speakers: Optional[int] = None) -> Tuple:
+        """
+        Run the pyannote pipeline and return the diarization together with
+        a {label: embedding} mapping for every detected speaker.
         """
         if not os.path.exists(audio_path):
             raise FileNotFoundError(f"Audio file not found: {audio_path}")
 
+        input_tensor = self._load_waveform(audio_path)
+
+        # Speaker-count hints constrain how many clusters pyannote may produce;
+        # they improve accuracy when the number of participants is known
+        hints = {}
+        if num_speakers is not None:
+            hints["num_speakers"] = num_speakers
+        if min_speakers is not None:
+            hints["min_speakers"] = min_speakers
+        if max_speakers is not None:
+            hints["max_speakers"] = max_speakers
+
+        output = self.pipeline(input_tensor, **hints)
+        diarization = output.speaker_diarization
+
+        # Embeddings are ordered like diarization.labels(). pyannote pads them
+        # with all-zero rows when the annotation has more labels than clusters;
+        # those rows (and any non-finite ones) carry no voice and are left out
+        embeddings = {}
+        if output.speaker_embeddings is not None:
+            for label, embedding in zip(diarization.labels(), output.speaker_embeddings):
+                embedding = np.asarray(embedding, dtype=np.float32)
+                norm = np.linalg.norm(embedding)
+                if np.isfinite(norm) and norm > 0:
+                    embeddings[label] = embedding
+
+        return diarization, embeddings
+
+    def identify(self, embeddings: Dict[str, np.ndarray]) -> Dict[str, Dict]:
+        """
+        Match diarized speakers against the enrolled speaker index.
+
+        Args:
+            embeddings (Dict[str, np.ndarray]): Embedding per diarization label.
+
+        Returns:
+            Dict[str, Dict]: Matched speaker record (with 'similarity') per label.
+        """
+        if not embeddings or self.speaker_index is None or len(self.speaker_index) == 0:
+            return {}
+
+        labels = list(embeddings)
+        try:
+            matches = self.speaker_index.search(np.stack([embeddings[l] for l in labels]), self.match_threshold)
+        except ValueError as e:
+            # Recognition is optional; e.g. an index built with another embedding
+            # model must not break diarization, so fall back to anonymous labels
+            logger.warning(f"Speaker recognition skipped: {e}")
+            return {}
+
+        identified = {}
+        for label, match in zip(labels, matches):
+            if match is not None:
+                speaker, similarity = match
+                identified[label] = {**speaker, "similarity": similarity}
+                logger.info(f"Recognised {label} as '{speaker['name']}' (similarity {similarity:.3f}).")
+        return identified
+
+    def diarize(self, audio_path: str, num_speakers: Optional[int] = None,
+                min_speakers: Optional[int] = None, max_speakers: Optional[int] = None) -> List[Dict]:
+        """
+        Perform speaker diarization on an audio file. Speakers found in the
+        speaker index are labelled with their enrolled name.
+
+        Args:
+            audio_path (str): Path to the audio file.
+            num_speakers (int): Exact number of speakers, if known (overrides min/max).
+            min_speakers (int): Lower bound on the number of speakers.
+            max_speakers (int): Upper bound on the number of speakers.
+
+        Returns:
+            A list of speaker segments with start time, end time, speaker label
+            and the enrolled speaker id (None for unknown speakers).
+        """
         logger.info(f"Starting diarization for: {audio_path}")
-        
-        temp_wav_path = None
+
         try:
-            # Load audio with pydub
-            audio = AudioSegment.from_file(audio_path)
-            # pyannote expects 16kHz mono
-            audio = audio.set_frame_rate(16000).set_channels(1)
-            
-            # Convert to numpy array and then to torch tensor
-            # pydub audio is int16 (usually), normalize to float between -1 and 1
-            data = np.array(audio.get_array_of_samples())
-            
-            # Create a temporary file for the converted audio
-            # temp_wav_path = "temp_diarization_audio.wav"
-            # audio.export(temp_wav_path, format="wav")
-
-            # Convert to float32 and normalize
-            if audio.sample_width == 2:
-                data = data.astype(np.float32) / 32768.0
-            elif audio.sample_width == 4:
-                data = data.astype(np.float32) / 2147483648.0
-            
-            # Create torch tensor of shape (channels, time) -> (1, time)
-            waveform = torch.from_numpy(data).unsqueeze(0)
-            
-            # Pass dictionary to pipeline
-            input_tensor = {"waveform": waveform, "sample_rate": 16000}
-
-            # Perform diarization
-            output = self.pipeline(input_tensor)
-            diarization = output.speaker_diarization
+            diarization, embeddings = self._run_pipeline(audio_path, num_speakers, min_speakers, max_speakers)
+            identified = self.identify(embeddings)
 
             # Process the output
             segments = []
             for turn, _, speaker in diarization.itertracks(yield_label=True):
+                known = identified.get(speaker)
                 segments.append({
                     "start": turn.start,
                     "end": turn.end,
-                    "speaker": speaker
+                    "speaker": known["name"] if known else speaker,
+                    "speaker_id": known["id"] if known else None
                 })
 
             logger.info("Diarization completed.")
             return segments
 
+        except FileNotFoundError:
+            raise
         except Exception as e:
             logger.error(f"Error during diarization: {e}")
             with open("diarization_error.log", "a") as f:
@@ -106,7 +195,36 @@ class DiarizationService:
                 f.write(traceback.format_exc())
                 f.write("\n")
             raise
-        finally:
-            # Clean up the temporary file
-            if temp_wav_path and os.path.exists(temp_wav_path):
-                os.remove(temp_wav_path)
\ No newline at end of file
+
+    def require_speaker_index(self) -> SpeakerIndex:
+        """
+        Return the speaker index, retrying the load if it failed at startup.
+
+        Raises:
+            ValueError, OSError: If the index still cannot be loaded.
+        """
+        if self.speaker_index is None:
+            self.speaker_index = get_speaker_index()
+        return self.speaker_index
+
+    def enroll_speaker(self, audio_path: str, name: str) -> Dict:
+        """
+        Enroll a voice from an audio sample. The sample should contain mostly
+        the person being enrolled; the speaker with the most speech is used.
+
+        Args:
+            audio_path (str): Path to the audio sample.
+            name (str): Name to label this speaker with in future diarizations.
+
+        Returns:
+            Dict: The stored speaker record.
+        """
+        speaker_index = self.require_speaker_index()
+        logger.info(f"Enrolling speaker '{name}' from: {audio_path}")
+        diarization, embeddings = self._run_pipeline(audio_path)
+        if not embeddings:
+            raise ValueError("No speech long enough to extract a speaker embedding was found in the sample.")
+
+        durations = {label: diarization.label_duration(label) for label in embeddings}
+        dominant = max(durations, key=durations.get)
+        return speaker_index.enroll(name, embeddings[dominant])
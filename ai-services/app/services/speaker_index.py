@@ -0,0 +1,314 @@
+import os
+import json
+import uuid
+import logging
+import threading
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import List, Dict, Optional, Tuple
+
+import numpy as np
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+load_dotenv()
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+EMBEDDINGS_FILE = "embeddings.npy"
+METADATA_FILE = "speakers.json"
+MIN_CAPACITY = 64
+
+
+class SpeakerIndex:
+    def __init__(self, index_dir: str):
+        """
+        On-disk index of enrolled speaker embeddings.
+
+        Embeddings are stored L2-normalised in a memory-mapped ``.npy`` file so
+        that cosine similarity against every enrolled voice is a single matrix
+        product. The JSON metadata file records which matrix row belongs to
+        each speaker and is the only source of truth: rows are written
+        copy-on-write into slots no committed record points at, and a change
+        only takes effect once the metadata has been atomically replaced. A
+        crash at any point therefore leaves every speaker on its own vector.
+
+        Args:
+            index_dir (str): Directory holding the embeddings and metadata files.
+        """
+        self.index_dir = index_dir
+        self.embeddings_path = os.path.join(index_dir, EMBEDDINGS_FILE)
+        self.metadata_path = os.path.join(index_dir, METADATA_FILE)
+        self._lock = threading.Lock()
+        self._matrix = None
+        self.dim = None
+        self.speakers: List[Dict] = []
+        self._row_count = 0
+        self._free_rows: List[int] = []
+        self._positions_by_id: Dict[str, int] = {}
+        self._positions_by_name: Dict[str, int] = {}
+        self._rows = np.zeros(0, dtype=np.intp)
+
+        os.makedirs(index_dir, exist_ok=True)
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.metadata_path):
+            logger.info(f"Creating new speaker index in: {self.index_dir}")
+            return
+
+        try:
+            with open(self.metadata_path, "r", encoding="utf-8") as f:
+                metadata = json.load(f)
+            self.dim = metadata["dim"]
+            self._row_count = metadata["row_count"]
+            self.speakers = metadata["speakers"]
+        except (json.JSONDecodeError, KeyError, TypeError) as e:
+            raise ValueError(f"Speaker index at {self.index_dir} is corrupted: "
+                             f"cannot read {METADATA_FILE} ({e!r}).") from e
+
+        if self._row_count > 0:
+            if not os.path.exists(self.embeddings_path):
+                raise ValueError(f"Speaker index at {self.index_dir} is corrupted: "
+                                 f"{EMBEDDINGS_FILE} is missing but metadata lists {len(self.speakers)} speakers.")
+            self._matrix = np.load(self.embeddings_path, mmap_mode="r+")
+            if self._matrix.shape[0] < self._row_count or self._matrix.shape[1] != self.dim:
+                raise ValueError(f"Speaker index at {self.index_dir} is corrupted: "
+                                 f"embeddings shape {self._matrix.shape} does not match metadata.")
+
+        try:
+            used_rows = [speaker["row"] for speaker in self.speakers]
+        except (KeyError, TypeError) as e:
+            raise ValueError(f"Speaker index at {self.index_dir} is corrupted: "
+                             f"malformed speaker record ({e!r}).") from e
+        if len(set(used_rows)) != len(used_rows) or any(not 0 <= row < self._row_count for row in used_rows):
+            raise ValueError(f"Speaker index at {self.index_dir} is corrupted: "
+                             f"speaker rows do not match the embeddings file.")
+        self._free_rows = sorted(set(range(self._row_count)) - set(used_rows), reverse=True)
+        self._reindex()
+        logger.info(f"Loaded speaker index with {len(self.speakers)} enrolled speakers.")
+
+    def _reindex(self):
+        self._positions_by_id = {speaker["id"]: i for i, speaker in enumerate(self.speakers)}
+        self._positions_by_name = {speaker["name"]: i for i, speaker in enumerate(self.speakers)}
+        self._rows = np.array([speaker["row"] for speaker in self.speakers], dtype=np.intp)
+
+    def _commit(self, speakers: List[Dict], row_count: int):
+        # Write to a temporary file first so a crash never leaves truncated JSON behind.
+        # Replacing the file is the commit point for every change to the index.
+        temp_path = self.metadata_path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            # json.dumps uses the C encoder; json.dump streams through the pure-Python one
+            f.write(json.dumps({"dim": self.dim, "row_count": row_count, "speakers": speakers}))
+        os.replace(temp_path, self.metadata_path)
+
+        self.speakers = speakers
+        self._row_count = row_count
+        self._reindex()
+
+    def _ensure_capacity(self, required: int):
+        capacity = 0 if self._matrix is None else self._matrix.shape[0]
+        if required <= capacity:
+            return
+
+        new_capacity = max(MIN_CAPACITY, capacity * 2, required)
+        temp_path = self.embeddings_path + ".tmp.npy"
+        grown = np.lib.format.open_memmap(temp_path, mode="w+", dtype=np.float32,
+                                          shape=(new_capacity, self.dim))
+        if self._matrix is not None:
+            grown[:self._row_count] = self._matrix[:self._row_count]
+        grown.flush()
+
+        # Release both mappings before replacing the file (required on Windows)
+        del grown
+        self._matrix = None
+        os.replace(temp_path, self.embeddings_path)
+        self._matrix = np.load(self.embeddings_path, mmap_mode="r+")
+
+    def _write_row(self, vector: np.ndarray) -> Tuple[int, int]:
+        """
+        Write a vector into a row no committed speaker points at.
+
+        Returns:
+            Tuple[int, int]: The row used and the row count to commit with it.
+        """
+        if self._free_rows:
+            row, row_count = self._free_rows[-1], self._row_count
+        else:
+            row, row_count = self._row_count, self._row_count + 1
+        self._ensure_capacity(row_count)
+        self._matrix[row] = vector
+        self._matrix.flush()
+        return row, row_count
+
+    def _normalize(self, embedding) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32).reshape(-1)
+        if self.dim is not None and vector.shape[0] != self.dim:
+            raise ValueError(f"Embedding has dimension {vector.shape[0]}, expected {self.dim}.")
+        norm = np.linalg.norm(vector)
+        if not np.isfinite(norm) or norm == 0:
+            raise ValueError("Embedding must be a finite, non-zero vector.")
+        return vector / norm
+
+    def __len__(self) -> int:
+        return len(self.speakers)
+
+    def enroll(self, name: str, embedding) -> Dict:
+        """
+        Add a voice to the index. Enrolling an existing name refines that
+        speaker's embedding with a running average instead of adding a new speaker.
+
+        Each call rewrites the metadata file, so enrolling costs O(number of
+        enrolled speakers); lookups are unaffected.
+
+        Args:
+            name (str): Display name used to label the speaker.
+            embedding: 1-D embedding vector from the diarization pipeline.
+
+        Returns:
+            Dict: The stored speaker record.
+        """
+        with self._lock:
+            vector = self._normalize(embedding)
+            if self.dim is None:
+                self.dim = int(vector.shape[0])
+
+            now = datetime.now(timezone.utc).isoformat()
+            reuses_free_row = bool(self._free_rows)
+            position = self._positions_by_name.get(name)
+            speakers = list(self.speakers)
+
+            if position is not None:
+                previous = self.speakers[position]
+                samples = previous["num_samples"]
+                merged = self._matrix[previous["row"]] * samples + vector
+                row, row_count = self._write_row(merged / np.linalg.norm(merged))
+                speaker = {**previous, "row": row, "num_samples": samples + 1, "updated_at": now}
+                speakers[position] = speaker
+            else:
+                row, row_count = self._write_row(vector)
+                speaker = {
+                    "id": uuid.uuid4().hex,
+                    "name": name,
+                    "row": row,
+                    "num_samples": 1,
+                    "created_at": now,
+                    "updated_at": now
+                }
+                speakers.append(speaker)
+
+            self._commit(speakers, row_count)
+
+            # The row is now referenced; a merged speaker's old row becomes free
+            if reuses_free_row:
+                self._free_rows.pop()
+            if position is not None:
+                self._free_rows.append(previous["row"])
+
+            logger.info(f"Enrolled speaker '{name}' ({speaker['id']}); index holds {len(self.speakers)} speakers.")
+            return dict(speaker)
+
+    def list_speakers(self) -> List[Dict]:
+        """
+        Return the records of all enrolled speakers.
+        """
+        with self._lock:
+            return [dict(speaker) for speaker in self.speakers]
+
+    def delete(self, speaker_id: str) -> bool:
+        """
+        Remove a speaker from the index. Only the metadata is rewritten; the
+        speaker's row is reused by later enrollments.
+
+        Returns:
+            bool: True if the speaker existed and was removed.
+        """
+        with self._lock:
+            position = self._positions_by_id.get(speaker_id)
+            if position is None:
+                return False
+
+            speaker = self.speakers[position]
+            self._commit(self.speakers[:position] + self.speakers[position + 1:], self._row_count)
+            self._free_rows.append(speaker["row"])
+            logger.info(f"Deleted speaker '{speaker['name']}' ({speaker_id}).")
+            return True
+
+    def search(self, embeddings, threshold: float) -> List[Optional[Tuple[Dict, float]]]:
+        """
+        Match query embeddings against the index using cosine similarity.
+
+        Each enrolled speaker is assigned to at most one query, best scores
+        first, since a single person should not be split across two labels.
+
+        Args:
+            embeddings: Array of shape (num_queries, dim). Rows that are not
+                finite (e.g. speakers with too little speech) never match.
+            threshold (float): Minimum cosine similarity to accept a match.
+
+        Returns:
+            List: For each query, a ``(speaker_record, similarity)`` tuple or None.
+        """
+        queries = np.asarray(embeddings, dtype=np.float32)
+        if queries.ndim == 1:
+            queries = queries[np.newaxis, :]
+        matches: List[Optional[Tuple[Dict, float]]] = [None] * queries.shape[0]
+
+        with self._lock:
+            count = len(self.speakers)
+            if count == 0 or queries.shape[0] == 0:
+                return matches
+            if queries.shape[1] != self.dim:
+                raise ValueError(f"Embeddings have dimension {queries.shape[1]}, expected {self.dim}.")
+
+            norms = np.linalg.norm(queries, axis=1, keepdims=True)
+            valid = np.isfinite(norms[:, 0]) & (norms[:, 0] > 0)
+            queries = np.where(valid[:, np.newaxis], queries, 0) / np.where(norms > 0, norms, 1)
+
+            # Score every allocated row in a single BLAS call, then keep the
+            # columns of enrolled speakers (free rows hold stale vectors)
+            scores = (queries @ self._matrix[:self._row_count].T)[:, self._rows]
+            scores[~valid] = -np.inf
+
+            # Other queries can take at most num_queries - 1 speakers, so each
+            # query's match is always among its top num_queries candidates
+            k = min(count, queries.shape[0])
+            candidates = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            candidate_scores = np.take_along_axis(scores, candidates, axis=1)
+            order = np.argsort(-candidate_scores, axis=1)
+            candidates = np.take_along_axis(candidates, order, axis=1)
+            candidate_scores = np.take_along_axis(candidate_scores, order, axis=1)
+
+            # Greedy assignment, most confident query first
+            taken = set()
+            for query in np.argsort(-candidate_scores[:, 0]):
+                for position, score in zip(candidates[query], candidate_scores[query]):
+                    if score < threshold:
+                        break
+                    if position not in taken:
+                        taken.add(position)
+                        matches[query] = (dict(self.speakers[position]), float(score))
+                        break
+
+            return matches
+
+
+@lru_cache(maxsize=None)
+def _open_speaker_index(index_dir: str) -> SpeakerIndex:
+    return SpeakerIndex(index_dir)
+
+
+def get_speaker_index(index_dir: Optional[str] = None) -> SpeakerIndex:
+    """
+    Return the process-wide SpeakerIndex for a directory so every service
+    shares one mapping, lock and free-row list.
+
+    Args:
+        index_dir (str): Index directory. Defaults to SPEAKER_INDEX_DIR or "speaker_index".
+    """
+    # Resolve the path before the cached call so equivalent spellings share one instance
+    index_dir = index_dir or os.getenv("SPEAKER_INDEX_DIR", "speaker_index")
+    return _open_speaker_index(os.path.realpath(index_dir))
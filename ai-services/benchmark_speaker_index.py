@@ -0,0 +1,81 @@
+import os
+import json
+import logging
+import time
+import uuid
+import shutil
+import tempfile
+import numpy as np
+
+from app.services.speaker_index import SpeakerIndex, EMBEDDINGS_FILE, METADATA_FILE
+
+# Configuration
+EMBEDDING_DIM = 256  # pyannote/speaker-diarization-3.1 (wespeaker) embedding size
+INDEX_SIZES = [100, 1000, 5000, 10000, 25000, 50000]
+QUERIES_PER_MEETING = 8  # diarized speakers matched per search call
+REPEATS = 50
+ENROLL_REPEATS = 10
+
+# Keep per-enroll INFO logs from burying the results table
+logging.getLogger("app.services.speaker_index").setLevel(logging.WARNING)
+
+def write_index(index_dir, rng, size):
+    """
+    Write an index of `size` random voices straight to disk in SpeakerIndex's
+    file format, since growing it through single enrollments is O(N^2).
+    """
+    voices = rng.standard_normal((size, EMBEDDING_DIM)).astype(np.float32)
+    voices /= np.linalg.norm(voices, axis=1, keepdims=True)
+    np.save(os.path.join(index_dir, EMBEDDINGS_FILE), voices)
+
+    speakers = [{
+        "id": uuid.uuid4().hex,
+        "name": f"voice-{i}",
+        "row": i,
+        "num_samples": 1,
+        "created_at": "",
+        "updated_at": ""
+    } for i in range(size)]
+    with open(os.path.join(index_dir, METADATA_FILE), "w", encoding="utf-8") as f:
+        json.dump({"dim": EMBEDDING_DIM, "row_count": size, "speakers": speakers}, f)
+
+def benchmark():
+    rng = np.random.default_rng(0)
+
+    print(f"Benchmarking speaker index ({QUERIES_PER_MEETING} speakers per search, dim={EMBEDDING_DIM})")
+    print(f"{'voices':>8} | {'enroll p50 (ms)':>15} | {'search p50 (ms)':>15} | {'search p95 (ms)':>15}")
+
+    for size in INDEX_SIZES:
+        index_dir = tempfile.mkdtemp(prefix="speaker_index_bench_")
+        try:
+            write_index(index_dir, rng, size)
+            index = SpeakerIndex(index_dir)
+
+            # Single enrollments, as done by POST /api/speakers; each new
+            # speaker is deleted again so the index size stays constant
+            enroll_timings = []
+            for i in range(ENROLL_REPEATS):
+                voice = rng.standard_normal(EMBEDDING_DIM)
+                start = time.perf_counter()
+                record = index.enroll(f"new-voice-{i}", voice)
+                enroll_timings.append((time.perf_counter() - start) * 1000)
+                index.delete(record["id"])
+
+            search_timings = []
+            for _ in range(REPEATS):
+                queries = rng.standard_normal((QUERIES_PER_MEETING, EMBEDDING_DIM)).astype(np.float32)
+                start = time.perf_counter()
+                index.search(queries, threshold=0.5)
+                search_timings.append((time.perf_counter() - start) * 1000)
+
+            p50, p95 = np.percentile(search_timings, [50, 95])
+            print(f"{size:>8} | {np.median(enroll_timings):>15.3f} | {p50:>15.3f} | {p95:>15.3f}")
+
+            if size == INDEX_SIZES[-1]:
+                size_mb = os.path.getsize(index.embeddings_path) / (1024 * 1024)
+                print(f"\nEmbeddings file size at {size} voices: {size_mb:.1f} MB")
+        finally:
+            shutil.rmtree(index_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,148 @@
+import os
+import shutil
+import tempfile
+import numpy as np
+
+from app.services.speaker_index import SpeakerIndex, EMBEDDINGS_FILE, METADATA_FILE
+
+# Configuration
+EMBEDDING_DIM = 256
+THRESHOLD = 0.5
+
+rng = np.random.default_rng(0)
+
+def unit(vector):
+    return vector / np.linalg.norm(vector)
+
+def names(matches):
+    return [match[0]["name"] if match else None for match in matches]
+
+def check(description, condition):
+    if not condition:
+        raise AssertionError(description)
+    print(f"OK: {description}")
+
+def test_search(index_dir):
+    index = SpeakerIndex(index_dir)
+    alice, bob, carol = rng.standard_normal((3, EMBEDDING_DIM))
+    index.enroll("alice", alice)
+    index.enroll("bob", bob)
+    for i, voice in enumerate(rng.standard_normal((200, EMBEDDING_DIM))):
+        index.enroll(f"noise-{i}", voice)
+
+    queries = np.stack([alice + 0.3 * rng.standard_normal(EMBEDDING_DIM), bob, carol,
+                        np.full(EMBEDDING_DIM, np.nan), np.zeros(EMBEDDING_DIM)])
+    check("search matches known voices and leaves unknown, NaN and zero queries anonymous",
+          names(index.search(queries, THRESHOLD)) == ["alice", "bob", None, None, None])
+
+    # Both queries are closest to alice; the weaker one must not also be labelled alice
+    check("a speaker is never assigned to two queries",
+          names(index.search(np.stack([alice, alice + 0.5 * rng.standard_normal(EMBEDDING_DIM)]), THRESHOLD))
+          == ["alice", None])
+
+    # The second query's best candidate is taken, so it falls back to its runner-up
+    mix = unit(unit(alice) * 0.8 + unit(bob) * 0.6)
+    check("a query whose best speaker is taken falls back to its next candidate",
+          names(index.search(np.stack([alice, mix]), THRESHOLD)) == ["alice", "bob"])
+
+    similarity = index.search(bob, THRESHOLD)[0][1]
+    check("similarity is the cosine similarity", abs(similarity - 1.0) < 1e-5)
+
+    try:
+        index.search(np.ones((1, EMBEDDING_DIM + 1)), THRESHOLD)
+        check("search rejects embeddings of the wrong dimension", False)
+    except ValueError:
+        check("search rejects embeddings of the wrong dimension", True)
+
+def test_enroll_merge(index_dir):
+    index = SpeakerIndex(index_dir)
+    first, second = rng.standard_normal((2, EMBEDDING_DIM))
+    record = index.enroll("dave", first)
+    merged = index.enroll("dave", second)
+
+    check("re-enrolling a name keeps the same speaker", merged["id"] == record["id"] and len(index) == 1)
+    check("re-enrolling counts the sample", merged["num_samples"] == 2)
+    expected = unit(unit(first) + unit(second))
+    stored = np.asarray(index._matrix[merged["row"]])
+    check("re-enrolling stores the running average of the samples", np.allclose(stored, expected, atol=1e-5))
+
+    index.enroll("dave", 2 * first)
+    expected = unit(2 * expected + unit(first))
+    stored = np.asarray(index._matrix[index.list_speakers()[0]["row"]])
+    check("the running average weights earlier samples by count", np.allclose(stored, expected, atol=1e-5))
+
+def test_delete_and_reload(index_dir):
+    index = SpeakerIndex(index_dir)
+    voices = rng.standard_normal((5, EMBEDDING_DIM))
+    records = [index.enroll(f"speaker-{i}", voice) for i, voice in enumerate(voices)]
+
+    check("deleting an unknown id returns False", index.delete("missing") is False)
+    check("deleting an enrolled speaker returns True", index.delete(records[1]["id"]) is True)
+    check("deleted speakers are no longer matched",
+          names(index.search(voices, THRESHOLD)) == ["speaker-0", None, "speaker-2", "speaker-3", "speaker-4"])
+
+    reloaded = SpeakerIndex(index_dir)
+    check("deletions persist across reloads", [s["id"] for s in reloaded.list_speakers()]
+          == [r["id"] for i, r in enumerate(records) if i != 1])
+    check("every speaker keeps its own voice after a reload",
+          names(reloaded.search(voices, THRESHOLD)) == ["speaker-0", None, "speaker-2", "speaker-3", "speaker-4"])
+
+    new_voice = rng.standard_normal(EMBEDDING_DIM)
+    reloaded.enroll("erin", new_voice)
+    check("freed rows are reused by later enrollments", reloaded._row_count == 5)
+    check("a reused row matches its new speaker only",
+          names(reloaded.search(np.stack([voices[1], new_voice]), THRESHOLD)) == [None, "erin"])
+
+def test_crash_consistency(index_dir):
+    index = SpeakerIndex(index_dir)
+    voices = rng.standard_normal((3, EMBEDDING_DIM))
+    for i, voice in enumerate(voices):
+        index.enroll(f"speaker-{i}", voice)
+    index.delete(index.list_speakers()[0]["id"])
+
+    # Simulate a crash after vectors reach the matrix but before the metadata commit
+    index._write_row(unit(rng.standard_normal(EMBEDDING_DIM)))
+    index._write_row(unit(rng.standard_normal(EMBEDDING_DIM)))
+
+    reloaded = SpeakerIndex(index_dir)
+    check("uncommitted writes never change who a row belongs to",
+          names(reloaded.search(voices, THRESHOLD)) == [None, "speaker-1", "speaker-2"])
+
+def test_validation(index_dir):
+    index = SpeakerIndex(index_dir)
+    for bad in (np.zeros(8), np.full(8, np.nan)):
+        try:
+            index.enroll("bad", bad)
+        except ValueError:
+            pass
+    check("a rejected first enrollment does not fix the index dimension", index.dim is None)
+    index.enroll("frank", rng.standard_normal(EMBEDDING_DIM))
+    check("a valid enrollment after a rejected one succeeds", index.dim == EMBEDDING_DIM and len(index) == 1)
+
+    os.remove(os.path.join(index_dir, EMBEDDINGS_FILE))
+    try:
+        SpeakerIndex(index_dir)
+        check("a missing embeddings file is reported as corruption", False)
+    except ValueError as e:
+        check("a missing embeddings file is reported as corruption", "corrupted" in str(e))
+
+    with open(os.path.join(index_dir, METADATA_FILE), "w", encoding="utf-8") as f:
+        f.write('{"dim": 25')
+    try:
+        SpeakerIndex(index_dir)
+        check("truncated metadata is reported as corruption", False)
+    except ValueError as e:
+        check("truncated metadata is reported as corruption", "corrupted" in str(e))
+
+def run_tests():
+    for test in (test_search, test_enroll_merge, test_delete_and_reload, test_crash_consistency, test_validation):
+        print(f"\n--- {test.__name__} ---")
+        index_dir = tempfile.mkdtemp(prefix="speaker_index_verify_")
+        try:
+            test(index_dir)
+        finally:
+            shutil.rmtree(index_dir, ignore_errors=True)
+    print("\nAll speaker index checks passed.")
+
+if __name__ == "__main__":
+    run_tests()